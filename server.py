@@ -20,14 +20,41 @@ leverage remote models when credentials are available.
 
 from __future__ import annotations
 
+import os
+
+# gevent workers only work if socket, ssl and threading are patched before
+# anything imports them: requests/urllib3 and the sessions, locks and
+# thread-locals created at import time below would otherwise keep the blocking
+# originals (HTTPS upstream calls then fail with a RecursionError in ssl).
+# gunicorn's own patching in the worker runs far too late, so do it here.
+gevent = None
+if os.environ.get("PROXY_WORKER_CLASS") == "gevent":  # pragma: no cover - optional
+    import gevent
+    from gevent import monkey
+
+    monkey.patch_all()
+
+import functools
+import hashlib
 import json
 import logging
-import os
+import mmap
 from pathlib import Path
 import pickle
-from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import queue
+import re
+import tempfile
+import threading
+import time
+from collections import ChainMap
+from concurrent.futures import Future
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import (
     Flask,
     Response,
@@ -36,6 +63,7 @@ from flask import (
     send_from_directory,
     stream_with_context,
 )
+from flask.json.provider import DefaultJSONProvider
 
 try:  # Optional heavy dependencies are loaded lazily when used.
     import faiss  # type: ignore
@@ -52,6 +80,32 @@ try:  # Sentence-Transformers provides the same model class used by the indexer.
 except Exception:  # pragma: no cover - optional dependency
     SentenceTransformer = None
 
+try:  # pyarrow lets pickled docstores be migrated to a memory-mapped file.
+    import pyarrow as pa
+except Exception:  # pragma: no cover - optional dependency
+    pa = None
+
+try:  # orjson is markedly faster than the stdlib encoder on the proxy hot path.
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+if orjson is not None:
+    # Match the stdlib encoder's leniency: non-string dict keys and NumPy
+    # values (e.g. FAISS scores) serialise instead of raising.
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    _loads = orjson.loads
+
+    def _dumps(obj: object) -> bytes:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+
+else:  # pragma: no cover - exercised only without orjson
+    _loads = json.loads
+
+    def _dumps(obj: object) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
 
 DEFAULT_CONFIG = {
     "GENESIS_BASE_URL": "https://api.ai.us.lmco.com/v1",
@@ -61,6 +115,9 @@ DEFAULT_CONFIG = {
     "VECTOR_INDEX_DIR": "./vectorstore",
     "EMBEDDING_MODEL": "text-embedding-3-small",
     "HTTP_TIMEOUT": 300,
+    "PRELOAD_RAG": False,
+    "RAG_HNSW": False,
+    "RAG_QUANTIZE": False,
 }
 
 CONFIG_PATH = Path(__file__).with_name("config.json")
@@ -69,52 +126,171 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("monky.server")
 
 
-def load_config() -> Dict[str, str]:
+_CONFIG_CACHE: Dict[Tuple[int, int], Dict[str, str]] = {}
+
+
+def _read_config_file() -> Dict[str, str]:
+    """Return the parsed ``config.json`` contents, memoised on file mtime/size."""
+
+    try:
+        st = os.stat(CONFIG_PATH)
+    except OSError:
+        return {}
+
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _CONFIG_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    data: Dict[str, str] = {}
+    try:
+        raw = _loads(CONFIG_PATH.read_bytes())
+        if isinstance(raw, dict):
+            data = {key: value for key, value in raw.items() if value is not None}
+    except Exception as exc:  # pragma: no cover - defensive coding
+        logger.warning("Failed to read config.json: %s", exc)
+
+    _CONFIG_CACHE.clear()
+    _CONFIG_CACHE[key] = data
+    return data
+
+
+def invalidate_config() -> None:
+    """Drop the memoised ``config.json`` contents (mainly useful for tests)."""
+
+    _CONFIG_CACHE.clear()
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Immutable snapshot of the resolved configuration."""
+
+    genesis_base_url: str
+    genesis_api_key: str
+    openrouter_api_key: str
+    openrouter_model: str
+    vector_index_dir: str
+    embedding_model: str
+    http_timeout: float
+    preload_rag: bool = False
+    rag_hnsw: bool = False
+    rag_quantize: bool = False
+
+
+def _as_bool(value: object) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "on"}
+    return bool(value)
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_dir(path: str) -> Path:
+    """Expand and resolve *path* once; ``resolve`` stats every component."""
+
+    return Path(path).expanduser().resolve()
+
+
+def load_config() -> Settings:
     """Load configuration from ``config.json`` and environment variables."""
 
-    config: Dict[str, str] = dict(DEFAULT_CONFIG)
-    if CONFIG_PATH.exists():
-        try:
-            with CONFIG_PATH.open("r", encoding="utf-8") as fp:
-                data = json.load(fp)
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    if value is None:
-                        continue
-                    config[key] = value
-        except Exception as exc:  # pragma: no cover - defensive coding
-            logger.warning("Failed to read config.json: %s", exc)
-
-    for key in list(config.keys()):
-        value = os.environ.get(key)
-        if value is not None:
-            config[key] = value
+    config: Dict[str, str] = dict(ChainMap(_read_config_file(), DEFAULT_CONFIG))
+    # Snapshot the environment once; the key-view intersection runs in C.
+    env = os.environ
+    config.update({key: env[key] for key in config.keys() & env.keys()})
 
     # Normalise paths and derived values.
-    vector_dir = Path(config["VECTOR_INDEX_DIR"]).expanduser().resolve()
-    config["VECTOR_INDEX_DIR"] = str(vector_dir)
-    return config
+    vector_dir = _resolve_dir(str(config["VECTOR_INDEX_DIR"]))
+    return Settings(
+        genesis_base_url=str(config["GENESIS_BASE_URL"] or ""),
+        genesis_api_key=str(config["GENESIS_API_KEY"] or ""),
+        openrouter_api_key=str(config["OPENROUTER_API_KEY"] or ""),
+        openrouter_model=str(config["OPENROUTER_MODEL"] or ""),
+        vector_index_dir=str(vector_dir),
+        embedding_model=str(config["EMBEDDING_MODEL"] or ""),
+        http_timeout=float(config["HTTP_TIMEOUT"] or DEFAULT_CONFIG["HTTP_TIMEOUT"]),
+        preload_rag=_as_bool(config["PRELOAD_RAG"]),
+        rag_hnsw=_as_bool(config["RAG_HNSW"]),
+        rag_quantize=_as_bool(config["RAG_QUANTIZE"]),
+    )
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that delegates to :mod:`orjson`."""
+
+    def dumps(self, obj: object, **kwargs: object) -> str:
+        return orjson.dumps(obj, default=self.default, option=_ORJSON_OPTIONS).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: object) -> object:
+        return orjson.loads(s)
 
 
 app = Flask(__name__, static_folder=None)
-app.config["SETTINGS"] = load_config()
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 
 # ---------------------------------------------------------------------------
 # Helper utilities
 # ---------------------------------------------------------------------------
 
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Per-provider base URLs and header templates, specialised from the settings
+# once by ``apply_settings`` so upstream calls only copy a ready-made dict.
+_SETTINGS: Optional[Settings] = None
+_BASE_URLS: Dict[str, str] = {}
+_HEADER_TEMPLATES: Dict[str, Mapping[str, str]] = {}
+
+
+def apply_settings(settings: Settings) -> None:
+    """Install *settings* and rebuild the derived provider tables."""
+
+    global _SETTINGS
+
+    _SETTINGS = settings
+    app.config["SETTINGS"] = settings
+    _BASE_URLS.clear()
+    _BASE_URLS.update(
+        {
+            "genesis": settings.genesis_base_url.rstrip("/"),
+            "openrouter": OPENROUTER_BASE_URL,
+        }
+    )
+    _HEADER_TEMPLATES.clear()
+    _HEADER_TEMPLATES.update(
+        {
+            "genesis": MappingProxyType(
+                {
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {settings.genesis_api_key}",
+                }
+            ),
+            "openrouter": MappingProxyType(
+                {
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {settings.openrouter_api_key}",
+                    # These headers are recommended by OpenRouter but optional.
+                    "HTTP-Referer": "http://localhost",
+                    "X-Title": "MONKY Dashboard",
+                }
+            ),
+        }
+    )
+
+
+def get_settings() -> Settings:
+    return _SETTINGS
+
 
-def get_settings() -> Dict[str, str]:
-    return app.config["SETTINGS"]
+apply_settings(load_config())
 
 
 def choose_provider(preferred: Optional[str] = None) -> str:
     settings = get_settings()
     preferred = (preferred or "").lower() or None
 
-    has_genesis = bool(settings.get("GENESIS_API_KEY"))
-    has_openrouter = bool(settings.get("OPENROUTER_API_KEY"))
+    has_genesis = bool(settings.genesis_api_key)
+    has_openrouter = bool(settings.openrouter_api_key)
 
     if preferred == "genesis" and has_genesis:
         return "genesis"
@@ -127,32 +303,59 @@ def choose_provider(preferred: Optional[str] = None) -> str:
     raise ValueError("No provider credentials configured")
 
 
-def build_headers(provider: str, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
-    settings = get_settings()
-    headers: Dict[str, str] = {"Content-Type": "application/json"}
+def build_headers(provider: str, extra: Optional[Dict[str, str]] = None) -> Mapping[str, str]:
+    """Return the request headers for *provider*.
+
+    Without *extra* the shared read-only template is returned as-is; requests
+    copies headers while preparing a request, so no per-call dict is needed.
+    """
 
-    if provider == "genesis":
-        headers["Authorization"] = f"Bearer {settings['GENESIS_API_KEY']}"
-    elif provider == "openrouter":
-        headers["Authorization"] = f"Bearer {settings['OPENROUTER_API_KEY']}"
-        # These headers are recommended by OpenRouter but optional.
-        headers.setdefault("HTTP-Referer", "http://localhost")
-        headers.setdefault("X-Title", "MONKY Dashboard")
-    else:  # pragma: no cover - defensive coding
-        raise ValueError(f"Unknown provider: {provider}")
+    try:
+        template = _HEADER_TEMPLATES[provider]
+    except KeyError:  # pragma: no cover - defensive coding
+        raise ValueError(f"Unknown provider: {provider}") from None
 
-    if extra:
-        headers.update(extra)
-    return headers
+    if not extra:
+        return template
+    return {**template, **extra}
 
 
 def provider_base_url(provider: str) -> str:
-    settings = get_settings()
-    if provider == "genesis":
-        return settings["GENESIS_BASE_URL"].rstrip("/")
-    if provider == "openrouter":
-        return "https://openrouter.ai/api/v1"
-    raise ValueError(f"Unknown provider: {provider}")
+    try:
+        return _BASE_URLS[provider]
+    except KeyError:
+        raise ValueError(f"Unknown provider: {provider}") from None
+
+
+def _new_session() -> requests.Session:
+    """Return a session whose pooled connections are kept alive between calls.
+
+    Idempotent requests are retried on gateway errors; POSTs are never
+    replayed because urllib3's default retry policy excludes them.
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            # Hand the last error response back to the caller instead of raising.
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# One session per provider so each upstream host gets its own keep-alive pool.
+_SESSIONS: Dict[str, requests.Session] = {
+    "genesis": _new_session(),
+    "openrouter": _new_session(),
+}
 
 
 def upstream_request(
@@ -161,22 +364,28 @@ def upstream_request(
     path: str,
     *,
     json_payload: Optional[dict] = None,
+    data: Optional[bytes] = None,
     params: Optional[dict] = None,
     stream: bool = False,
     headers: Optional[Dict[str, str]] = None,
 ) -> requests.Response:
-    """Forward a request to the specified provider."""
+    """Forward a request to the specified provider.
+
+    ``data`` forwards an already-encoded JSON body untouched and takes the
+    place of ``json_payload`` for pure passthrough routes.
+    """
 
     base_url = provider_base_url(provider)
     url = f"{base_url}{path}"
     merged_headers = build_headers(provider, headers)
 
-    timeout = (10, float(get_settings().get("HTTP_TIMEOUT", 300)))
-    response = requests.request(
+    timeout = (10, get_settings().http_timeout)
+    response = _SESSIONS[provider].request(
         method,
         url,
         headers=merged_headers,
         json=json_payload,
+        data=data,
         params=params,
         stream=stream,
         timeout=timeout,
@@ -189,17 +398,146 @@ def upstream_request(
 # ---------------------------------------------------------------------------
 
 
+def _file_signature(path: Path) -> str:
+    """Return ``"<size>-<mtime_ns>"`` identifying the current contents of *path*.
+
+    Derived files record the signature of their source and are reused only on
+    an exact match, so a restored backup or an mtime-preserving copy that is
+    older than the derived file still invalidates it.
+    """
+
+    st = path.stat()
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def _run_blocking(func, *args, **kwargs):
+    """Call CPU-bound *func* without stalling a cooperative (gevent) worker.
+
+    Once threading is monkey-patched every request "thread", the embed
+    batcher and the warm-up are greenlets sharing one OS thread, so a model
+    load, forward pass or FAISS search would freeze every other request in
+    the worker until it finished.  Under gevent the call runs on the hub's
+    native thread pool (these libraries release the GIL) while only the
+    calling greenlet waits; otherwise it is made directly.
+    """
+
+    if gevent is None:
+        return func(*args, **kwargs)
+    return gevent.get_hub().threadpool.apply(func, args, kwargs)  # pragma: no cover
+
+
+# Schema metadata key recording which docstore an Arrow sidecar was built from.
+_ARROW_SIGNATURE_KEY = b"monky.docstore_signature"
+
+
+class _EmbedBatcher:
+    """Coalesce concurrent query embeddings into batched ``encode`` calls.
+
+    Requests arriving within ``window`` seconds of each other are encoded in a
+    single forward pass by one background thread, which also serialises access
+    to the embedder across request threads.
+    """
+
+    def __init__(self, embedder, *, max_batch: int = 32, window: float = 0.005):
+        self._embedder = embedder
+        self._max_batch = max_batch
+        self._window = window
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def encode(self, text: str):
+        """Return the 1-D embedding for *text*, blocking until it is ready."""
+
+        future: Future = Future()
+        self._queue.put((text, future))
+        self._ensure_worker()
+        return future.result()
+
+    def encode_many(self, texts: List[str]) -> List[object]:
+        """Return embeddings for *texts*, queued together so they share a batch."""
+
+        futures: List[Future] = []
+        for text in texts:
+            future: Future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        self._ensure_worker()
+        return [future.result() for future in futures]
+
+    def _ensure_worker(self) -> None:
+        # Checked on every call so a worker lost across a fork is restarted.
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="rag-embed-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._window
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                vectors = _run_blocking(
+                    self._embedder.encode,
+                    [text for text, _ in batch],
+                    batch_size=self._max_batch,
+                    convert_to_numpy=True,
+                )
+            except Exception as exc:  # pragma: no cover - model specific
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
 class RagIndex:
     """Small helper around a FAISS index generated by the vectorizer."""
 
-    def __init__(self, index_dir: Path, embedding_model: str):
+    def __init__(
+        self,
+        index_dir: Path,
+        embedding_model: str,
+        *,
+        use_hnsw: bool = False,
+        quantize: bool = False,
+    ):
         self.index_dir = index_dir
         self.embedding_model_name = embedding_model
+        self.use_hnsw = use_hnsw
+        self.quantize = quantize
         self._index = None
-        self._documents: List[Dict[str, str]] = []
+        # Documents are held column-wise, one entry per FAISS row: NumPy
+        # object arrays, or memory-mapped Arrow columns for migrated pickles.
+        self._text_arr = None
+        self._source_arr = None
         self._embedder = None
+        self._batcher: Optional[_EmbedBatcher] = None
+        self._load_lock = threading.Lock()
+        # Per-thread FAISS output buffers; request threads search concurrently.
+        self._search_buffers = threading.local()
+        self._buffered_search = True
         self._loaded = False
         self._load_error: Optional[str] = None
+        # Per-instance cache so dashboards re-issuing the same query skip the
+        # transformer forward pass entirely.
+        self._embed_cached = functools.lru_cache(maxsize=512)(self._embed)
 
     # File name candidates recognised from the existing tooling.
     _INDEX_CANDIDATES = [
@@ -227,6 +565,17 @@ class RagIndex:
     def ensure_loaded(self) -> None:
         if self._loaded:
             return
+        # Concurrent first requests (or the warm-up thread) must not each
+        # read the index and load the model.
+        with self._load_lock:
+            if not self._loaded:
+                _run_blocking(self._load)
+
+    def _load(self) -> None:
+        # A failed attempt may have read the docstore already; a retry must
+        # read it again rather than keep the stale columns.
+        self._text_arr = None
+        self._source_arr = None
         if not self.index_dir.exists():
             self._load_error = f"Vector store not found at {self.index_dir}"
             return
@@ -245,25 +594,56 @@ class RagIndex:
             return
 
         try:
-            self._index = faiss.read_index(str(index_path))
+            self._index = self._read_index(index_path)
+            # Quantisation wins over HNSW: both only convert flat indexes.
+            if self.quantize:
+                self._index = self._to_sq8(self._index, index_path)
+            if self.use_hnsw:
+                self._index = self._to_hnsw(self._index, index_path)
         except Exception as exc:  # pragma: no cover - depends on faiss availability
             self._load_error = f"Unable to read FAISS index: {exc}"
             return
 
-        try:
-            if docs_path.suffix in {".json"}:
-                with docs_path.open("r", encoding="utf-8") as fp:
-                    metadata = json.load(fp)
-            else:
-                with docs_path.open("rb") as fp:
-                    metadata = pickle.load(fp)
-        except Exception as exc:  # pragma: no cover - depends on file availability
-            self._load_error = f"Unable to read document metadata: {exc}"
-            return
-
-        self._documents = self._normalize_metadata(metadata)
-
-        if not self._documents:
+        arrow_path = None
+        if pa is not None and docs_path.suffix == ".pkl":
+            arrow_path = docs_path.with_suffix(".arrow")
+            # Taken before reading the pickle, so a docstore replaced mid-read
+            # leaves a sidecar that no longer matches and is rebuilt next time.
+            signature = self._docs_signature(docs_path)
+            if arrow_path.exists():
+                try:
+                    columns = self._read_arrow_columns(arrow_path, signature)
+                except Exception as exc:  # pragma: no cover - corrupt sidecar
+                    logger.warning("Ignoring unreadable Arrow docstore %s: %s", arrow_path, exc)
+                else:
+                    if columns is not None:
+                        self._text_arr, self._source_arr = columns
+
+        if self._text_arr is None:
+            migrated = False
+            columns = self._load_normalized_cache(docs_path)
+            if columns is None:
+                try:
+                    if docs_path.suffix in {".json"}:
+                        metadata = _loads(docs_path.read_bytes())
+                    else:
+                        with docs_path.open("rb") as fp:
+                            metadata = pickle.load(fp)
+                except Exception as exc:  # pragma: no cover - depends on file availability
+                    self._load_error = f"Unable to read document metadata: {exc}"
+                    return
+
+                columns = self._normalize_metadata(metadata)
+                if columns[0] and arrow_path is not None:
+                    migrated = self._migrate_to_arrow(arrow_path, signature, *columns)
+                if columns[0] and not migrated:
+                    self._store_normalized_cache(docs_path, *columns)
+            if not migrated:
+                texts, sources = columns
+                self._text_arr = np.array(texts, dtype=object)
+                self._source_arr = np.array(sources, dtype=object)
+
+        if not len(self._text_arr):
             self._load_error = "Document metadata is empty"
             return
 
@@ -278,97 +658,393 @@ class RagIndex:
         except Exception as exc:  # pragma: no cover - model specific
             self._load_error = f"Failed to load embedding model '{self.embedding_model_name}': {exc}"
             return
+        self._batcher = _EmbedBatcher(self._embedder)
 
         self._loaded = True
         self._load_error = None
         logger.info("Loaded FAISS index from %s", index_path)
 
-    def _normalize_metadata(self, metadata) -> List[Dict[str, str]]:
-        """Return a list of dictionaries with ``text`` and ``source`` keys."""
+    @staticmethod
+    def _read_index(index_path: Path):
+        """Read the FAISS index, memory-mapping it read-only when supported.
+
+        A mapped index is backed by the page cache, so forked workers share
+        the vectors instead of each holding a private heap copy.
+        """
+
+        flags = getattr(faiss, "IO_FLAG_MMAP", 0) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+        if flags:
+            try:
+                return faiss.read_index(str(index_path), flags)
+            except Exception:  # pragma: no cover - index type without mmap support
+                logger.debug("FAISS index %s cannot be memory-mapped", index_path)
+        return faiss.read_index(str(index_path))
+
+    # Graph degree and search breadth used when converting flat indexes.
+    _HNSW_NEIGHBOURS = 32
+    _HNSW_EF_SEARCH = 64
+
+    def _to_hnsw(self, index, index_path: Path):
+        """Return an HNSW version of a flat *index*, cached next to the original.
+
+        Flat indexes scan every vector per query; HNSW keeps the same metric
+        but answers in roughly logarithmic time.  The converted index is
+        written to ``<index>.<signature>.hnsw`` and reused until the source
+        file changes.
+        """
+
+        if not isinstance(index, faiss.IndexFlat):
+            return index
+
+        def build():
+            hnsw = faiss.IndexHNSWFlat(index.d, self._HNSW_NEIGHBOURS, index.metric_type)
+            hnsw.add(index.reconstruct_n(0, index.ntotal))
+            return hnsw
+
+        hnsw = self._cached_conversion(index_path, "hnsw", build)
+        hnsw.hnsw.efSearch = self._HNSW_EF_SEARCH
+        return hnsw
+
+    def _to_sq8(self, index, index_path: Path):
+        """Return an 8-bit scalar-quantised version of a flat *index*.
+
+        Flat search is bound by memory bandwidth; storing one byte per
+        dimension instead of four cuts the bytes scanned per query (and the
+        RAM held) by about 4x at a small recall cost.  Cached as
+        ``<index>.<signature>.sq8``.
+        """
+
+        if not isinstance(index, faiss.IndexFlat):
+            return index
+
+        def build():
+            vectors = index.reconstruct_n(0, index.ntotal)
+            quantized = faiss.IndexScalarQuantizer(
+                index.d, faiss.ScalarQuantizer.QT_8bit, index.metric_type
+            )
+            quantized.train(vectors)
+            quantized.add(vectors)
+            return quantized
+
+        return self._cached_conversion(index_path, "sq8", build)
+
+    @staticmethod
+    def _cached_conversion(index_path: Path, suffix: str, build):
+        """Load ``<index>.<signature>.<suffix>`` if present, else *build* and save it.
+
+        The source's size and mtime are part of the file name, so rebuilding
+        the source index (even with an older mtime) misses the cache; stale
+        conversions are removed when the new one is written.
+        """
+
+        cache_path = index_path.with_name(
+            f"{index_path.name}.{_file_signature(index_path)}.{suffix}"
+        )
+        if cache_path.exists():
+            return faiss.read_index(str(cache_path))
+
+        converted = build()
+        try:
+            for stale in index_path.parent.glob(f"{index_path.name}.*.{suffix}"):
+                stale.unlink()
+            faiss.write_index(converted, str(cache_path))
+        except Exception as exc:  # pragma: no cover - read-only vector store
+            logger.warning("Unable to cache converted index at %s: %s", cache_path, exc)
+        logger.info("Converted flat FAISS index to %s (%d vectors)", suffix, converted.ntotal)
+        return converted
+
+    @staticmethod
+    def _normalized_cache_path(docs_path: Path) -> Path:
+        return docs_path.with_name(f"{docs_path.stem}.normalized.jsonl")
+
+    @staticmethod
+    def _docs_signature(docs_path: Path) -> str:
+        return _file_signature(docs_path)
+
+    def _load_normalized_cache(self, docs_path: Path) -> Optional[Tuple[List[str], List[str]]]:
+        """Return ``(texts, sources)`` from the normalised JSONL sidecar if current.
 
-        documents: List[Dict[str, str]] = []
+        The first line records the size and mtime of the docstore it was
+        built from; any mismatch means the sidecar is stale and is ignored.
+        """
+
+        cache_path = self._normalized_cache_path(docs_path)
+        try:
+            with cache_path.open("rb") as fp, mmap.mmap(
+                fp.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                header = _loads(mapped.readline())
+                if header.get("signature") != self._docs_signature(docs_path):
+                    return None
+                texts: List[str] = []
+                sources: List[str] = []
+                for line in iter(mapped.readline, b""):
+                    row = _loads(line)
+                    texts.append(row["text"])
+                    sources.append(row["source"])
+                return texts, sources
+        except Exception:
+            return None
+
+    def _store_normalized_cache(self, docs_path: Path, texts: List[str], sources: List[str]) -> None:
+        cache_path = self._normalized_cache_path(docs_path)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.tmp")
+        try:
+            with tmp_path.open("wb") as fp:
+                fp.write(_dumps({"signature": self._docs_signature(docs_path)}) + b"\n")
+                fp.writelines(
+                    _dumps({"text": text, "source": source}) + b"\n"
+                    for text, source in zip(texts, sources)
+                )
+            os.replace(tmp_path, cache_path)
+        except Exception as exc:  # pragma: no cover - read-only vector store
+            logger.warning("Unable to cache normalised docstore at %s: %s", cache_path, exc)
+
+    @staticmethod
+    def _read_arrow_columns(path: Path, signature: str):
+        """Return the mapped ``(text, source)`` columns, or ``None`` if stale.
+
+        The docstore signature (size and mtime) is stored in the schema
+        metadata; a restored or rolled-back pickle, even one older than the
+        sidecar, no longer matches and forces a fresh migration.
+        """
+
+        reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+        metadata = reader.schema.metadata or {}
+        if metadata.get(_ARROW_SIGNATURE_KEY) != signature.encode("ascii"):
+            return None
+        table = reader.read_all()
+        return table.column("text"), table.column("source")
+
+    def _migrate_to_arrow(
+        self, arrow_path: Path, signature: str, texts: List[str], sources: List[str]
+    ) -> bool:
+        """Write the columns as an Arrow IPC file and switch to mapped columns.
+
+        Subsequent loads memory-map the Arrow file instead of unpickling the
+        whole docstore, so only the rows returned by searches are paged in.
+        """
+
+        table = pa.table(
+            {
+                "text": [str(text or "") for text in texts],
+                "source": [str(source or "") for source in sources],
+            }
+        ).replace_schema_metadata({_ARROW_SIGNATURE_KEY: signature.encode("ascii")})
+        tmp_path = arrow_path.with_name(f"{arrow_path.name}.tmp")
+        try:
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, arrow_path)
+            self._text_arr, self._source_arr = self._read_arrow_columns(arrow_path, signature)
+        except Exception as exc:  # pragma: no cover - read-only vector store
+            logger.warning("Unable to write Arrow docstore %s: %s", arrow_path, exc)
+            return False
+        return True
+
+    @staticmethod
+    def _take(column, idx) -> List[object]:
+        if isinstance(column, np.ndarray):
+            return column[idx].tolist()
+        return column.take(idx).to_pylist()
+
+    @staticmethod
+    def _ordered_keys(metadata: Dict[object, object]) -> Iterable[object]:
+        """Return *metadata*'s keys in FAISS row order without sorting if possible.
+
+        Contiguous ``0..n-1`` integer keys map straight onto a ``range``; other
+        integer keys are sorted.  String keys (UUIDs, stringified ids) follow
+        insertion order, which is the order the indexer added the vectors in.
+        """
+
+        if all(isinstance(key, int) for key in metadata):
+            if metadata and min(metadata) == 0 and max(metadata) == len(metadata) - 1:
+                return range(len(metadata))
+            return sorted(metadata)
+        return metadata.keys()
+
+    def _normalize_metadata(self, metadata) -> Tuple[List[str], List[str]]:
+        """Return parallel ``(texts, sources)`` lists, one entry per FAISS row."""
 
         if isinstance(metadata, dict):
             # Some vectorizers store documents in a mapping keyed by integer index
             # or UUID.  Attempt to normalise common shapes.
-            for key in sorted(metadata.keys()):
-                entry = metadata[key]
-                documents.append(self._extract_doc(entry))
+            entries: Iterable[object] = (metadata[key] for key in self._ordered_keys(metadata))
         elif isinstance(metadata, list):
-            for entry in metadata:
-                documents.append(self._extract_doc(entry))
+            entries = metadata
         else:
             logger.warning("Unsupported metadata format: %s", type(metadata))
+            entries = ()
 
-        # Filter out empty entries while preserving indices for FAISS results.
-        cleaned: List[Dict[str, str]] = []
-        for item in documents:
-            if not item.get("text"):
-                item["text"] = ""
-            cleaned.append(item)
-        return cleaned
+        # Empty entries are kept (as "") so indices still line up with FAISS.
+        texts: List[str] = []
+        sources: List[str] = []
+        for entry in entries:
+            text, source = self._extract_doc(entry)
+            texts.append(text or "")
+            sources.append(source)
+        return texts, sources
 
     @staticmethod
-    def _extract_doc(entry) -> Dict[str, str]:
+    def _extract_doc(entry) -> Tuple[str, str]:
         if isinstance(entry, dict):
             text = entry.get("text") or entry.get("page_content") or ""
             metadata = entry.get("metadata") or {}
             source = metadata.get("source") if isinstance(metadata, dict) else ""
             if not source:
                 source = entry.get("source") or metadata.get("filename", "")
-            return {"text": text, "source": source}
+            return text, source
         if isinstance(entry, str):
-            return {"text": entry, "source": ""}
-        return {"text": str(entry), "source": ""}
+            return entry, ""
+        return str(entry), ""
 
     def stats(self) -> Dict[str, object]:
         self.ensure_loaded()
         return {
             "hasIndex": self._loaded,
-            "docCount": len(self._documents) if self._loaded else 0,
+            "docCount": len(self._text_arr) if self._loaded else 0,
             "indexPath": str(self.index_dir),
             "error": self._load_error,
         }
 
-    def query(self, text: str, k: int = 5) -> List[Dict[str, object]]:
+    def _embed(self, text: str):
+        """Return the ``(1, d)`` float32 embedding for *text* (read-only)."""
+
+        vector = self._batcher.encode(text)
+        if vector is None:
+            return None
+        # The batcher hands back a row of the whole batch matrix; copy it into
+        # an owned (1, d) float32 buffer so a cache entry does not keep the
+        # rest of the batch alive, and FAISS can use it without converting.
+        vector = np.array(vector, dtype=np.float32, order="C", ndmin=2)
+        # The array is shared between callers through the cache.
+        vector.setflags(write=False)
+        return vector
+
+    # Largest ``k`` served from the reusable per-thread output buffers.
+    _MAX_BUFFERED_K = 64
+
+    def _search(self, query_vector, k: int):
+        """Run a single-vector search, writing into reusable output buffers.
+
+        Falls back to FAISS-allocated results for large ``k`` or when the
+        installed FAISS predates the ``D=``/``I=`` keyword arguments.
+        """
+
+        if not self._buffered_search or k > self._MAX_BUFFERED_K:
+            return _run_blocking(self._index.search, query_vector, k)
+
+        buffers = getattr(self._search_buffers, "arrays", None)
+        if buffers is None:
+            buffers = (
+                np.empty((1, self._MAX_BUFFERED_K), dtype=np.float32),
+                np.empty((1, self._MAX_BUFFERED_K), dtype=np.int64),
+            )
+            self._search_buffers.arrays = buffers
+        distances, indices = buffers[0][:, :k], buffers[1][:, :k]
+        try:
+            _run_blocking(self._index.search, query_vector, k, D=distances, I=indices)
+        except TypeError:  # pragma: no cover - older FAISS bindings
+            self._buffered_search = False
+            return _run_blocking(self._index.search, query_vector, k)
+        return distances, indices
+
+    def _lookup(self, text: str, k: int):
+        """Return the ``(distances, indices)`` row for *text*, or ``None``."""
+
         self.ensure_loaded()
         if not self._loaded or not self._index or self._embedder is None:
             raise RuntimeError(self._load_error or "RAG index not available")
 
         text = (text or "").strip()
         if not text:
-            return []
+            return None
 
-        query_vector = self._embedder.encode([text], convert_to_numpy=True)
+        query_vector = self._embed_cached(" ".join(text.split()))
         if query_vector is None:
+            return None
+
+        distances, indices = self._search(query_vector, k)
+        return distances[0], indices[0]
+
+    def query(self, text: str, k: int = 5) -> List[Dict[str, object]]:
+        hits = self._lookup(text, k)
+        if hits is None:
             return []
+        return self._matches(*hits)
 
-        if query_vector.ndim == 1:
-            query_vector = query_vector.reshape(1, -1)
+    def query_columnar(self, text: str, k: int = 5) -> Dict[str, List[object]]:
+        """Return the matches for *text* as parallel ``text``/``source``/``score`` lists."""
 
-        query_vector = query_vector.astype("float32")
-        distances, indices = self._index.search(query_vector, k)
+        hits = self._lookup(text, k)
+        if hits is None:
+            return {"text": [], "source": [], "score": []}
+        distances, indices = hits
+        valid = (indices >= 0) & (indices < len(self._text_arr))
+        idx = indices[valid]
+        return {
+            "text": self._take(self._text_arr, idx),
+            "source": self._take(self._source_arr, idx),
+            "score": distances[valid].tolist(),
+        }
 
-        results: List[Dict[str, object]] = []
-        for score, idx in zip(distances[0], indices[0]):
-            if idx < 0 or idx >= len(self._documents):
-                continue
-            doc = self._documents[idx]
-            results.append(
-                {
-                    "text": doc.get("text", ""),
-                    "source": doc.get("source", ""),
-                    "score": float(score),
-                }
+    def query_batch(self, texts: List[str], k: int = 5) -> List[List[Dict[str, object]]]:
+        """Return the matches for each of *texts* using a single FAISS search.
+
+        All queries are embedded together in one ``encode`` call; blank
+        queries yield an empty match list.
+        """
+
+        self.ensure_loaded()
+        if not self._loaded or not self._index or self._embedder is None:
+            raise RuntimeError(self._load_error or "RAG index not available")
+
+        keys = [" ".join((text or "").split()) for text in texts]
+        wanted = [key for key in dict.fromkeys(keys) if key]
+        if not wanted:
+            return [[] for _ in keys]
+
+        vectors = self._batcher.encode_many(wanted)
+        present = [(key, vector) for key, vector in zip(wanted, vectors) if vector is not None]
+        if not present:
+            return [[] for _ in keys]
+
+        matrix = np.ascontiguousarray(np.stack([vector for _, vector in present]), dtype=np.float32)
+        distances, indices = _run_blocking(self._index.search, matrix, k)
+        rows = {
+            key: self._matches(distances[row], indices[row])
+            for row, (key, _) in enumerate(present)
+        }
+        return [rows.get(key, []) for key in keys]
+
+    def _matches(self, distances, indices) -> List[Dict[str, object]]:
+        """Build match dicts from one row of FAISS results."""
+
+        valid = (indices >= 0) & (indices < len(self._text_arr))
+        idx = indices[valid]
+        return [
+            {"text": text, "source": source, "score": score}
+            for text, source, score in zip(
+                self._take(self._text_arr, idx),
+                self._take(self._source_arr, idx),
+                distances[valid].tolist(),
             )
-        return results
+        ]
 
 
 rag_index = RagIndex(
-    Path(get_settings()["VECTOR_INDEX_DIR"]),
-    get_settings()["EMBEDDING_MODEL"],
+    Path(get_settings().vector_index_dir),
+    get_settings().embedding_model,
+    use_hnsw=get_settings().rag_hnsw,
+    quantize=get_settings().rag_quantize,
 )
 
+# Loading at import time means gunicorn workers forked from the master share
+# the index and model pages copy-on-write and the first query is not cold.
+if get_settings().preload_rag:
+    rag_index.ensure_loaded()
+
 
 # ---------------------------------------------------------------------------
 # Routes
@@ -390,20 +1066,141 @@ def health() -> Response:
 @app.get("/env")
 def environment() -> Response:
     settings = get_settings()
-    return jsonify(
+    response = jsonify(
         {
-            "GENESIS_API_KEY": settings.get("GENESIS_API_KEY", ""),
-            "OPENROUTER_API_KEY": settings.get("OPENROUTER_API_KEY", ""),
-            "GENESIS_BASE_URL": settings.get("GENESIS_BASE_URL"),
-            "OPENROUTER_MODEL": settings.get("OPENROUTER_MODEL"),
+            "GENESIS_API_KEY": settings.genesis_api_key,
+            "OPENROUTER_API_KEY": settings.openrouter_api_key,
+            "GENESIS_BASE_URL": settings.genesis_base_url,
+            "OPENROUTER_MODEL": settings.openrouter_model,
         }
     )
+    # Always revalidate, but let unchanged settings come back as a 304.
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+_RELAY_CHUNK_SIZE = 64 * 1024
+
+
+def _relay_bytes(upstream: requests.Response, content_type: str) -> Iterator[bytes]:
+    """Yield the upstream body and release the pooled connection afterwards.
+
+    Event streams are relayed chunk by chunk as they arrive; a fixed read size
+    would make urllib3 wait for a full buffer and delay events.  Other bodies
+    are read in 64 KiB blocks to keep the number of WSGI writes low.
+    """
+
+    chunk_size = None if content_type.startswith("text/event-stream") else _RELAY_CHUNK_SIZE
+    try:
+        yield from upstream.iter_content(chunk_size=chunk_size)
+    finally:
+        upstream.close()
+
+
+# Bodies up to this size are buffered; streaming them is not worth the overhead.
+_BUFFERED_RELAY_LIMIT = 4 * 1024
 
 
 def relay_json_response(response: requests.Response) -> Response:
+    """Relay an upstream body, streaming it when it is large or of unknown size.
+
+    Only responses requested with ``stream=True`` benefit; otherwise requests
+    has already buffered the body and this simply hands it on.
+    """
+
     content_type = response.headers.get("Content-Type", "application/json")
-    data = response.content
-    return Response(data, status=response.status_code, content_type=content_type)
+    length = response.headers.get("Content-Length")
+    if length is not None and length.isdigit() and int(length) <= _BUFFERED_RELAY_LIMIT:
+        return Response(response.content, status=response.status_code, content_type=content_type)
+
+    headers = {}
+    # Content-Length describes the encoded body; requests decodes gzip/deflate.
+    if length is not None and "Content-Encoding" not in response.headers:
+        headers["Content-Length"] = length
+    return Response(
+        stream_with_context(_relay_bytes(response, content_type)),
+        status=response.status_code,
+        content_type=content_type,
+        headers=headers,
+    )
+
+
+MODELS_CACHE_TTL = 300.0
+
+# ``(provider, path) -> (expires_at, body, content_type, etag)`` for successful
+# model listings, which change rarely but are fetched on every page load.
+_MODELS_CACHE: Dict[Tuple[str, str], Tuple[float, bytes, str, str]] = {}
+# ``/api/models/<model_id>`` keys the cache on a client-supplied id, so cap it.
+_MODELS_CACHE_MAX = 256
+_MODELS_CACHE_LOCK = threading.Lock()
+
+# The cache lives in each worker process.  ``/api/models/refresh`` replaces
+# this stamp file, and every worker drops its cache when it sees the stamp's
+# inode/mtime change, so a refresh reaches all workers on their next lookup.
+_MODELS_REFRESH_STAMP = Path(tempfile.gettempdir()) / (
+    "monky-models-"
+    + hashlib.blake2b(str(Path(__file__).resolve()).encode(), digest_size=8).hexdigest()
+    + ".stamp"
+)
+_models_generation: Optional[Tuple[int, int]] = None
+
+
+def _models_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(_MODELS_REFRESH_STAMP)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def _sync_models_generation() -> None:
+    """Drop the cached listings if another worker requested a refresh."""
+
+    global _models_generation
+
+    stamp = _models_stamp()
+    if stamp != _models_generation:
+        with _MODELS_CACHE_LOCK:
+            _MODELS_CACHE.clear()
+            _models_generation = stamp
+
+
+def _store_model_response(key: Tuple[str, str], entry: Tuple[float, bytes, str, str]) -> None:
+    """Insert *entry*, dropping expired entries and then the oldest beyond the cap."""
+
+    now = time.monotonic()
+    with _MODELS_CACHE_LOCK:
+        for stale in [k for k, cached in _MODELS_CACHE.items() if cached[0] <= now]:
+            del _MODELS_CACHE[stale]
+        _MODELS_CACHE.pop(key, None)
+        while len(_MODELS_CACHE) >= _MODELS_CACHE_MAX:
+            del _MODELS_CACHE[next(iter(_MODELS_CACHE))]
+        _MODELS_CACHE[key] = entry
+
+
+def cached_model_response(provider: str, path: str) -> Response:
+    """Relay a model listing, serving it from the in-process TTL cache."""
+
+    _sync_models_generation()
+    key = (provider, path)
+    entry = _MODELS_CACHE.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        upstream = upstream_request("GET", provider, path)
+        if upstream.status_code != 200:
+            return relay_json_response(upstream)
+        body = upstream.content
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        content_type = upstream.headers.get("Content-Type", "application/json")
+        entry = (time.monotonic() + MODELS_CACHE_TTL, body, content_type, etag)
+        _store_model_response(key, entry)
+
+    _, body, content_type, etag = entry
+    response = Response(body, status=200, content_type=content_type)
+    response.set_etag(etag)
+    # Browsers revalidate on every load (a cheap 304) so a refresh is visible.
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route("/api/models", methods=["GET"])
@@ -414,8 +1211,7 @@ def list_models() -> Response:
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
 
-    upstream = upstream_request("GET", provider, "/models")
-    return relay_json_response(upstream)
+    return cached_model_response(provider, "/models")
 
 
 @app.route("/api/models/<model_id>", methods=["GET"])
@@ -426,68 +1222,153 @@ def get_model(model_id: str) -> Response:
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
 
-    upstream = upstream_request("GET", provider, f"/models/{model_id}")
-    return relay_json_response(upstream)
+    return cached_model_response(provider, f"/models/{model_id}")
+
+
+@app.route("/api/models/refresh", methods=["POST"])
+def refresh_models() -> Response:
+    global _models_generation
+
+    # Replacing the file gives it a new inode, so even a same-tick refresh on a
+    # coarse-mtime filesystem is seen as a new generation by other workers.
+    tmp_path = _MODELS_REFRESH_STAMP.with_name(f"{_MODELS_REFRESH_STAMP.name}.{os.getpid()}")
+    try:
+        tmp_path.write_bytes(str(time.time_ns()).encode("ascii"))
+        os.replace(tmp_path, _MODELS_REFRESH_STAMP)
+    except OSError as exc:  # pragma: no cover - unwritable temp dir
+        logger.warning("Could not signal model refresh to other workers: %s", exc)
+    with _MODELS_CACHE_LOCK:
+        _MODELS_CACHE.clear()
+        _models_generation = _models_stamp()
+    return jsonify({"ok": True})
 
 
 @app.route("/api/embeddings", methods=["POST"])
 def embeddings() -> Response:
-    payload = request.json or {}
-    provider = payload.get("provider") or request.args.get("provider")
+    # Embedding inputs can be large, so the body is forwarded verbatim and
+    # only decoded when it may carry a ``provider`` hint.
+    body = request.get_data(cache=False) or b"{}"
+    provider = None
+    if b'"provider"' in body:
+        try:
+            payload = _loads(body)
+        except ValueError:
+            return jsonify({"error": "Request body must be valid JSON"}), 400
+        if isinstance(payload, dict):
+            provider = payload.get("provider")
+    provider = provider or request.args.get("provider")
     try:
         provider = choose_provider(provider)
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
 
-    upstream = upstream_request("POST", provider, "/embeddings", json_payload=payload)
+    upstream = upstream_request("POST", provider, "/embeddings", data=body, stream=True)
     return relay_json_response(upstream)
 
 
+def _json_body() -> Dict[str, object]:
+    """Return the request's JSON object, or ``{}`` for empty or non-JSON bodies."""
+
+    # Only an explicit zero length can be skipped; chunked bodies have no
+    # Content-Length at all.
+    if request.content_length == 0:
+        return {}
+    payload = request.get_json(silent=True, cache=True)
+    return payload if isinstance(payload, dict) else {}
+
+
 def augment_messages_with_rag(messages: List[Dict[str, str]], rag_matches: List[Dict[str, object]]) -> List[Dict[str, str]]:
     if not rag_matches:
         return messages
 
     context_lines = ["Use the following context to answer the user's question."]
     for idx, match in enumerate(rag_matches, start=1):
-        prefix = f"[{idx}]"
-        snippet = match.get("text", "")
         source = match.get("source", "")
         if source:
-            context_lines.append(f"{prefix} Source: {source}")
-        context_lines.append(f"{prefix} {snippet}")
+            context_lines.append(f"[{idx}] Source: {source}")
+        context_lines.append(f"[{idx}] {match.get('text', '')}")
     context_message = {"role": "system", "content": "\n".join(context_lines)}
 
-    augmented = [m.copy() for m in messages]
-    augmented.insert(0, context_message)
-    return augmented
+    # The original message dicts are never mutated downstream, so they are
+    # shared rather than copied.
+    return [context_message, *messages]
+
+
+_DATA_PREFIX = b"data:"
+_DONE_LINE = b"[DONE]"
+_SSE_DONE_RE = re.compile(rb"^data:[ \t]*\[DONE\][ \t]*\r?$", re.MULTILINE)
+
+
+def _relay_sse(upstream: requests.Response) -> Iterator[bytes]:
+    """Forward upstream SSE bytes unchanged until the ``[DONE]`` sentinel.
+
+    Only complete lines are forwarded; a trailing partial line is held back so
+    the sentinel is still detected when it straddles two network chunks.
+    """
+
+    # A bytearray keeps a long line spread over many chunks linear to buffer.
+    pending = bytearray()
+    for chunk in upstream.iter_content(chunk_size=None):
+        if not chunk:
+            continue
+        cut = chunk.rfind(b"\n") + 1
+        if not cut:
+            pending += chunk
+            continue
+        if pending:
+            pending += chunk[:cut]
+            complete = bytes(pending)
+            pending.clear()
+        else:
+            complete = chunk[:cut]
+        pending += chunk[cut:]
+        # The substring test is a plain memory scan; the anchored regex only
+        # runs on the rare block that may hold the sentinel.
+        done = _DONE_LINE in complete and _SSE_DONE_RE.search(complete)
+        if done:
+            if done.start():
+                yield complete[: done.start()]
+            return
+        yield complete
+    if pending and not _SSE_DONE_RE.match(pending):
+        yield bytes(pending) + b"\n\n"
+
+
+def _reframe_lines(upstream: requests.Response) -> Iterator[bytes]:
+    """Wrap each line of a non-SSE upstream body in an SSE ``data:`` frame."""
+
+    for line in upstream.iter_lines():
+        if line.startswith(_DATA_PREFIX):
+            line = line[len(_DATA_PREFIX) :].strip()
+        if not line:
+            continue
+        if line == _DONE_LINE:
+            break
+        yield b"data: " + line + b"\n\n"
 
 
 def stream_chat_response(upstream: requests.Response, citations: List[Dict[str, object]]) -> Response:
+    content_type = upstream.headers.get("Content-Type", "")
+    relay = _relay_sse if content_type.startswith("text/event-stream") else _reframe_lines
+
     @stream_with_context
-    def event_stream() -> Iterator[str]:
+    def event_stream() -> Iterator[bytes]:
         try:
-            for raw_line in upstream.iter_lines(decode_unicode=True):
-                if not raw_line:
-                    continue
-                line = raw_line
-                if line.startswith("data:"):
-                    line = line[len("data:") :].strip()
-                if not line:
-                    continue
-                if line == "[DONE]":
-                    break
-                yield f"data: {line}\n\n"
+            yield from relay(upstream)
         finally:
             upstream.close()
-        final_event = json.dumps({"done": True, "citations": citations})
-        yield f"data: {final_event}\n\n"
+        yield b"data: " + _dumps({"done": True, "citations": citations}) + b"\n\n"
 
-    return Response(event_stream(), content_type="text/event-stream")
+    return Response(
+        event_stream(),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/api/chat/completions", methods=["POST"])
 def chat_completions() -> Response:
-    payload = request.json or {}
+    payload = _json_body()
     stream = bool(payload.get("stream"))
     rag_requested = bool(payload.get("rag"))
     provider_hint = payload.get("provider")
@@ -503,17 +1384,33 @@ def chat_completions() -> Response:
 
     rag_matches: List[Dict[str, object]] = []
     if rag_requested:
+        try:
+            history = max(int(payload.get("rag_history") or 1), 1)
+        except (TypeError, ValueError):
+            return jsonify({"error": "rag_history must be an integer"}), 400
         user_messages = [m for m in messages if m.get("role") == "user"]
-        latest = user_messages[-1]["content"] if user_messages else ""
         try:
-            rag_matches = rag_index.query(latest, k=payload.get("rag_k", 5))
+            if history == 1:
+                latest = user_messages[-1]["content"] if user_messages else ""
+                rag_matches = rag_index.query(latest, k=payload.get("rag_k", 5))
+            else:
+                # Retrieve for the last few user turns in one batched search,
+                # keeping the first occurrence of each passage.
+                recent = [m.get("content") or "" for m in user_messages[-history:]]
+                seen = set()
+                for matches in rag_index.query_batch(recent[::-1], k=payload.get("rag_k", 5)):
+                    for match in matches:
+                        if match["text"] not in seen:
+                            seen.add(match["text"])
+                            rag_matches.append(match)
         except Exception as exc:
             logger.warning("RAG lookup failed: %s", exc)
             rag_matches = []
 
-    augmented_messages = augment_messages_with_rag(messages, rag_matches)
-    outbound_payload = dict(payload)
-    outbound_payload["messages"] = augmented_messages
+    # Only build a new payload when RAG context actually changes the messages.
+    outbound_payload = payload
+    if rag_matches:
+        outbound_payload = {**payload, "messages": augment_messages_with_rag(messages, rag_matches)}
 
     try:
         upstream = upstream_request(
@@ -529,35 +1426,42 @@ def chat_completions() -> Response:
     if stream:
         return stream_chat_response(upstream, rag_matches)
 
-    data = upstream.json()
+    try:
+        data = _loads(upstream.content)
+    except ValueError:
+        return relay_json_response(upstream)
+    if not isinstance(data, dict):
+        return relay_json_response(upstream)
     data.setdefault("citations", rag_matches)
-    return jsonify(data), upstream.status_code
+    return Response(_dumps(data), status=upstream.status_code, content_type="application/json")
 
 
 def proxy_assistants_request(method: str, path: str, stream: bool = False) -> Response:
-    settings = get_settings()
-    if not settings.get("GENESIS_API_KEY"):
+    if not get_settings().genesis_api_key:
         return jsonify({"error": "Genesis credentials are required for this endpoint"}), 400
 
     headers = {"OpenAI-Beta": "assistants=v2"}
-    payload = request.json if request.data else None
+    body = request.get_data(cache=False) or None
     params = request.args.to_dict(flat=True)
 
     upstream = upstream_request(
         method,
         "genesis",
         path,
-        json_payload=payload,
+        data=body,
         params=params,
-        stream=stream,
+        # Always streamed from upstream so relay_json_response can pipe large
+        # bodies through instead of buffering them first.
+        stream=True,
         headers=headers,
     )
 
     if stream:
+        content_type = upstream.headers.get("Content-Type", "text/event-stream")
         return Response(
-            stream_with_context(upstream.iter_content(chunk_size=None)),
+            stream_with_context(_relay_bytes(upstream, content_type)),
             status=upstream.status_code,
-            content_type=upstream.headers.get("Content-Type", "text/event-stream"),
+            content_type=content_type,
         )
 
     return relay_json_response(upstream)
@@ -585,11 +1489,14 @@ def rag_stats() -> Response:
 
 @app.route("/api/rag/query", methods=["POST"])
 def rag_query() -> Response:
-    payload = request.json or {}
+    payload = _json_body()
     query = payload.get("q") or ""
     k = int(payload.get("k") or 5)
+    # ``?format=columnar`` returns parallel text/source/score lists instead of
+    # one object per match.
+    columnar = request.args.get("format") == "columnar"
     try:
-        results = rag_index.query(query, k=k)
+        results = rag_index.query_columnar(query, k=k) if columnar else rag_index.query(query, k=k)
     except Exception as exc:
         return jsonify({"error": str(exc), "matches": []}), 500
 
@@ -601,11 +1508,84 @@ def rag_query() -> Response:
 # ---------------------------------------------------------------------------
 
 
+def _signal_ready(port: int) -> None:
+    """Write *port* to ``$MONKY_READY_FILE`` once the server is listening.
+
+    A launcher can wait for this file to appear instead of polling
+    ``/health`` over TCP.
+    """
+
+    ready_file = os.environ.get("MONKY_READY_FILE")
+    if ready_file:
+        Path(ready_file).write_text(str(port), encoding="utf-8")
+
+
+def _warm_rag_index() -> None:
+    """Load the RAG index in a background thread so the first query is warm.
+
+    Only called once no further fork can happen (in a gunicorn worker or the
+    single-process server); with ``PRELOAD_RAG`` the index is already loaded
+    at import and this returns immediately.
+    """
+
+    threading.Thread(target=rag_index.ensure_loaded, name="rag-warmup", daemon=True).start()
+
+
+def _run_gunicorn(host: str, port: int) -> bool:
+    """Serve :data:`app` with gunicorn's threaded workers when it is installed."""
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        return False
+
+    # ``PROXY_WORKER_CLASS=gevent`` switches to cooperative workers that can
+    # hold hundreds of idle upstream streams without a thread per request.  The
+    # variable must be set before this module is imported: the monkey-patching
+    # at the top of the file is what makes the gevent worker usable.  RAG
+    # model loads, embeddings and searches go through ``_run_blocking`` so they
+    # run on gevent's native thread pool instead of blocking the worker.
+    options = {
+        "bind": f"{host}:{port}",
+        "worker_class": os.environ.get("PROXY_WORKER_CLASS", "gthread"),
+        "workers": int(os.environ.get("PROXY_WORKERS", "2")),
+        "threads": int(os.environ.get("PROXY_THREADS", "16")),
+        "worker_connections": int(os.environ.get("PROXY_WORKER_CONNECTIONS", "1000")),
+        # Streaming chat completions can legitimately run for minutes.
+        "timeout": 600,
+        "when_ready": lambda server: _signal_ready(port),
+        "post_fork": lambda server, worker: _warm_rag_index(),
+    }
+
+    class _ProxyApplication(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    _ProxyApplication().run()
+    return True
+
+
 def main() -> None:
     host = os.environ.get("PROXY_HOST", "127.0.0.1")
     port = int(os.environ.get("PROXY_PORT", "5000"))
     debug = os.environ.get("FLASK_DEBUG", "0") == "1"
-    app.run(host=host, port=port, debug=debug)
+    if debug:
+        # The reloader forks its own child, so no readiness file is written.
+        app.run(host=host, port=port, debug=True, threaded=True)
+        return
+    if _run_gunicorn(host, port):
+        return
+
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, app, threaded=True)
+    _warm_rag_index()
+    _signal_ready(port)
+    server.serve_forever()
 
 
 if __name__ == "__main__":  # pragma: no cover - script execution
@@ -0,0 +1,493 @@
+import dataclasses
+import io
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import server  # noqa: E402  - imported after sys.path manipulation
+from requests.structures import CaseInsensitiveDict  # noqa: E402
+
+
+class FakeUpstream:
+    """Minimal stand-in for a streamed :class:`requests.Response`."""
+
+    def __init__(self, chunks, *, status=200, content_type="application/json", headers=None):
+        self.status_code = status
+        self.headers = CaseInsensitiveDict({"Content-Type": content_type, **(headers or {})})
+        self._chunks = list(chunks)
+        self.closed = False
+
+    @property
+    def content(self):
+        return b"".join(self._chunks)
+
+    def iter_content(self, chunk_size=None):
+        yield from self._chunks
+
+    def iter_lines(self):
+        yield from self.content.splitlines()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client():
+    original = server.get_settings()
+    server.apply_settings(
+        dataclasses.replace(original, genesis_api_key="", openrouter_api_key="test-key")
+    )
+    server._MODELS_CACHE.clear()
+    yield server.app.test_client()
+    server._MODELS_CACHE.clear()
+    server.apply_settings(original)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Queue fake upstream responses and record the calls made for them."""
+
+    responses = []
+    calls = []
+
+    def fake_request(method, provider, path, **kwargs):
+        calls.append((method, provider, path, kwargs))
+        return responses.pop(0)
+
+    monkeypatch.setattr(server, "upstream_request", fake_request)
+    return responses, calls
+
+
+@pytest.fixture
+def config_file(monkeypatch, tmp_path):
+    path = tmp_path / "config.json"
+    monkeypatch.setattr(server, "CONFIG_PATH", path)
+    monkeypatch.setattr(server, "_CONFIG_CACHE", {})
+    return path
+
+
+def test_config_file_is_parsed_once_until_it_changes(config_file, monkeypatch):
+    config_file.write_text('{"A": "1", "B": null}')
+    loads = []
+    original_loads = server._loads
+    monkeypatch.setattr(server, "_loads", lambda data: loads.append(data) or original_loads(data))
+
+    assert server._read_config_file() == {"A": "1"}
+    assert server._read_config_file() is server._read_config_file()
+    assert len(loads) == 1
+
+    # Same mtime, different size: still picked up.
+    mtime = config_file.stat().st_mtime_ns
+    config_file.write_text('{"A": "22"}')
+    os.utime(config_file, ns=(mtime, mtime))
+    assert server._read_config_file() == {"A": "22"}
+    assert len(loads) == 2
+    assert len(server._CONFIG_CACHE) == 1
+
+
+def test_missing_config_file_reads_as_empty(config_file):
+    assert server._read_config_file() == {}
+
+
+def relay(chunks):
+    return b"".join(server._relay_sse(FakeUpstream(chunks)))
+
+
+def test_relay_sse_detects_sentinel_split_across_chunks():
+    body = relay([b'data: {"a": 1}\n\ndata: [DO', b"NE]\n\n", b"data: late\n\n"])
+    assert body == b'data: {"a": 1}\n\n'
+
+
+def test_relay_sse_joins_partial_lines_and_flushes_the_tail():
+    assert relay([b"data: he", b"llo\n\n", b"data: tail"]) == b"data: hello\n\ndata: tail\n\n"
+
+
+def test_relay_sse_handles_crlf_framing():
+    body = relay([b"data: x\r\n\r\ndata: [DONE]\r\n", b"\r\n"])
+    assert body == b"data: x\r\n\r\n"
+
+
+def test_stream_chat_response_appends_citations_and_closes_upstream(client, upstream):
+    responses, _ = upstream
+    fake = FakeUpstream(
+        [b"data: one\n\n", b"data: [DONE]\n\n"], content_type="text/event-stream"
+    )
+    responses.append(fake)
+    response = client.post("/api/chat/completions", json={"stream": True, "messages": []})
+    assert response.headers["Cache-Control"] == "no-cache"
+    relayed, final, trailer = response.get_data().split(b"\n\n")
+    assert relayed == b"data: one"
+    assert json.loads(final[len(b"data: "):]) == {"done": True, "citations": []}
+    assert trailer == b""
+    assert fake.closed
+
+
+def test_relay_json_response_streams_bodies_of_unknown_size(client):
+    body = b"x" * (server._BUFFERED_RELAY_LIMIT + 1)
+    fake = FakeUpstream([body[:100], body[100:]])
+    with server.app.test_request_context("/"):
+        response = server.relay_json_response(fake)
+        assert response.is_streamed
+        assert b"".join(response.response) == body
+    assert fake.closed
+
+
+@pytest.fixture
+def both_providers(client):
+    server.apply_settings(dataclasses.replace(server.get_settings(), genesis_api_key="g-key"))
+    return client
+
+
+def test_embeddings_forwards_the_raw_body_undecoded(both_providers, upstream, monkeypatch):
+    responses, calls = upstream
+    responses.append(FakeUpstream([b'{"data": []}']))
+    body = b'{"model": "m",  "input": ["a", "b"]}'
+
+    def fail(data):
+        raise AssertionError("body without a provider hint should not be decoded")
+
+    monkeypatch.setattr(server, "_loads", fail)
+    response = both_providers.post("/api/embeddings", data=body, content_type="application/json")
+
+    assert response.get_json() == {"data": []}
+    [(method, provider, path, kwargs)] = calls
+    assert (method, provider, path) == ("POST", "genesis", "/embeddings")
+    assert kwargs["data"] == body
+
+
+def test_embeddings_sniffs_the_provider_from_the_body(both_providers, upstream):
+    responses, calls = upstream
+    responses.append(FakeUpstream([b"{}"]))
+    body = b'{"provider": "openrouter", "input": "a"}'
+    both_providers.post("/api/embeddings", data=body, content_type="application/json")
+    assert calls[0][1] == "openrouter"
+    assert calls[0][3]["data"] == body
+
+    response = both_providers.post(
+        "/api/embeddings", data=b'{"provider": ', content_type="application/json"
+    )
+    assert response.status_code == 400
+    assert len(calls) == 1
+
+
+def test_json_body_reads_chunked_requests():
+    with server.app.test_request_context(
+        "/",
+        method="POST",
+        input_stream=io.BytesIO(b'{"q": "hi"}'),
+        headers={"Transfer-Encoding": "chunked", "Content-Type": "application/json"},
+        environ_base={"wsgi.input_terminated": True},
+    ):
+        assert server._json_body() == {"q": "hi"}
+    with server.app.test_request_context("/", method="POST", data=b"not json"):
+        assert server._json_body() == {}
+
+
+def test_chat_rag_history_batches_and_deduplicates_matches(client, upstream, monkeypatch):
+    responses, calls = upstream
+    responses.append(FakeUpstream([b'{"id": "chat"}']))
+    shared = {"text": "shared", "source": "a.md", "score": 0.1}
+    batches = []
+
+    def fake_query_batch(texts, k=5):
+        batches.append(texts)
+        return [[shared], [shared, {"text": "older", "source": "b.md", "score": 0.2}]]
+
+    monkeypatch.setattr(server.rag_index, "query_batch", fake_query_batch)
+    messages = [{"role": "user", "content": "first"}, {"role": "user", "content": "second"}]
+    response = client.post(
+        "/api/chat/completions", json={"rag": True, "rag_history": 2, "messages": messages}
+    )
+
+    assert batches == [["second", "first"]]
+    assert [match["text"] for match in response.get_json()["citations"]] == ["shared", "older"]
+    assert calls[0][3]["json_payload"]["messages"][1:] == messages
+
+
+@pytest.mark.parametrize("value", ["two", [2]])
+def test_chat_rejects_invalid_rag_history(client, value):
+    response = client.post(
+        "/api/chat/completions", json={"rag": True, "rag_history": value, "messages": []}
+    )
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "rag_history must be an integer"}
+
+
+def test_chat_ignores_rag_history_without_rag(client, upstream):
+    responses, calls = upstream
+    responses.append(FakeUpstream([b'{"id": "chat"}']))
+    response = client.post("/api/chat/completions", json={"rag_history": "two", "messages": []})
+    assert response.status_code == 200
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def models_stamp(monkeypatch, tmp_path):
+    stamp = tmp_path / "models.stamp"
+    monkeypatch.setattr(server, "_MODELS_REFRESH_STAMP", stamp)
+    monkeypatch.setattr(server, "_models_generation", None)
+    return stamp
+
+
+def test_models_listing_is_cached_and_revalidates_with_304(client, upstream, models_stamp):
+    responses, calls = upstream
+    responses.append(FakeUpstream([b'{"data": []}']))
+
+    first = client.get("/api/models")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/models", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert len(calls) == 1
+
+    responses.append(FakeUpstream([b'{"data": [1]}']))
+    client.post("/api/models/refresh")
+    assert client.get("/api/models", headers={"If-None-Match": etag}).status_code == 200
+    assert len(calls) == 2
+
+
+def test_env_revalidates_with_304(client):
+    first = client.get("/env")
+    assert first.headers["Cache-Control"] == "no-cache"
+    second = client.get("/env", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+
+
+def test_models_refresh_from_another_worker_drops_the_cache(client, upstream, models_stamp):
+    responses, calls = upstream
+    responses.extend([FakeUpstream([b'{"data": []}']), FakeUpstream([b'{"data": [1]}'])])
+    client.get("/api/models")
+    client.get("/api/models")
+    assert len(calls) == 1
+
+    # Another worker handling POST /api/models/refresh replaces the stamp file.
+    replacement = models_stamp.with_name("other-worker")
+    replacement.write_bytes(b"1")
+    os.replace(replacement, models_stamp)
+
+    assert client.get("/api/models").get_json() == {"data": [1]}
+    assert len(calls) == 2
+
+
+def test_models_cache_evicts_beyond_its_cap(monkeypatch):
+    monkeypatch.setattr(server, "_MODELS_CACHE_MAX", 2)
+    server._MODELS_CACHE.clear()
+    expired = (time.monotonic() - 1, b"", "", "")
+    server._store_model_response(("p", "stale"), expired)
+    for name in ("a", "b", "c"):
+        server._store_model_response(("p", name), (time.monotonic() + 60, b"", "", ""))
+    assert list(server._MODELS_CACHE) == [("p", "b"), ("p", "c")]
+    server._MODELS_CACHE.clear()
+
+
+@pytest.fixture
+def rag_store(tmp_path, monkeypatch):
+    """A four-row flat FAISS store whose fake embedder maps "q <i>" to row i."""
+
+    faiss = pytest.importorskip("faiss")
+    np = pytest.importorskip("numpy")
+    vectors = np.eye(4, dtype="float32")
+    index = faiss.IndexFlatL2(4)
+    index.add(vectors)
+    faiss.write_index(index, str(tmp_path / "index.faiss"))
+
+    class FakeEmbedder:
+        def __init__(self, name, **kwargs):
+            pass
+
+        def encode(self, texts, **kwargs):
+            return np.stack([vectors[int(text.split()[-1])] for text in texts])
+
+    monkeypatch.setattr(server, "SentenceTransformer", FakeEmbedder)
+    return tmp_path
+
+
+def write_docstore(path, texts, *, mtime_ns=None):
+    docs = [{"text": text, "metadata": {"source": f"{text}.md"}} for text in texts]
+    if path.suffix == ".pkl":
+        path.write_bytes(pickle.dumps(docs))
+    else:
+        path.write_text(json.dumps(docs))
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def top_text(store, query="q 1"):
+    return server.RagIndex(store, "fake").query(query, k=1)[0]["text"]
+
+
+def test_pickled_docstore_migrates_to_arrow_and_is_reused(rag_store, monkeypatch):
+    pytest.importorskip("pyarrow")
+    write_docstore(rag_store / "docstore.pkl", ["a0", "a1", "a2", "a3"])
+    assert top_text(rag_store) == "a1"
+    assert (rag_store / "docstore.arrow").exists()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("pickle should not be read again")
+
+    monkeypatch.setattr(server.pickle, "load", fail)
+    assert top_text(rag_store, "q 2") == "a2"
+
+
+def test_arrow_docstore_is_rebuilt_when_the_pickle_is_rolled_back(rag_store):
+    pytest.importorskip("pyarrow")
+    docs_path = rag_store / "docstore.pkl"
+    write_docstore(docs_path, ["old0", "old1", "old2", "old3"])
+    assert top_text(rag_store) == "old1"
+
+    # Restoring an older backup leaves the pickle older than the sidecar.
+    arrow_mtime = (rag_store / "docstore.arrow").stat().st_mtime_ns
+    write_docstore(docs_path, ["new0", "new1", "new2", "new3"], mtime_ns=arrow_mtime - 10**9)
+    assert top_text(rag_store) == "new1"
+
+
+@pytest.mark.parametrize("option, suffix", [("use_hnsw", "hnsw"), ("quantize", "sq8")])
+def test_converted_index_is_rebuilt_when_the_source_index_changes(rag_store, option, suffix):
+    faiss = pytest.importorskip("faiss")
+    np = pytest.importorskip("numpy")
+    write_docstore(rag_store / "docstore.json", ["d0", "d1", "d2", "d3"])
+
+    def query():
+        rag = server.RagIndex(rag_store, "fake", **{option: True})
+        return rag.query("q 1", k=1)[0]["text"]
+
+    assert query() == "d1"
+    [first] = rag_store.glob(f"index.faiss.*.{suffix}")
+
+    # Rebuild the source with the rows rotated and an mtime older than the cache.
+    index_path = rag_store / "index.faiss"
+    rebuilt = faiss.IndexFlatL2(4)
+    rebuilt.add(np.roll(np.eye(4, dtype="float32"), -1, axis=0))
+    faiss.write_index(rebuilt, str(index_path))
+    older = first.stat().st_mtime_ns - 10**9
+    os.utime(index_path, ns=(older, older))
+
+    assert query() == "d0"
+    assert [path.name for path in rag_store.glob(f"index.faiss.*.{suffix}")] != [first.name]
+    assert len(list(rag_store.glob(f"index.faiss.*.{suffix}"))) == 1
+
+
+def test_json_docstore_is_normalised_once_into_a_jsonl_sidecar(rag_store, monkeypatch):
+    docs_path = rag_store / "docstore.json"
+    write_docstore(docs_path, ["a0", "a1", "a2", "a3"])
+    assert top_text(rag_store) == "a1"
+    assert (rag_store / "docstore.normalized.jsonl").exists()
+
+    def fail(self, metadata):
+        raise AssertionError("the sidecar should be used instead")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(server.RagIndex, "_normalize_metadata", fail)
+        assert top_text(rag_store, "q 3") == "a3"
+
+    sidecar_mtime = (rag_store / "docstore.normalized.jsonl").stat().st_mtime_ns
+    write_docstore(docs_path, ["b0", "b1", "b2", "b3"], mtime_ns=sidecar_mtime - 10**9)
+    assert top_text(rag_store) == "b1"
+
+
+def test_normalised_sidecar_is_read_through_mmap_and_survives_corruption(rag_store):
+    docs_path = rag_store / "docstore.json"
+    write_docstore(docs_path, ["ä0", "ß1 ✓", "c2", "d3"])
+    rag = server.RagIndex(rag_store, "fake")
+    sidecar = rag_store / "docstore.normalized.jsonl"
+    rag.ensure_loaded()
+    assert rag._load_normalized_cache(docs_path)[0] == ["ä0", "ß1 ✓", "c2", "d3"]
+
+    # A truncated row (valid header) makes the sidecar unusable, not the index.
+    sidecar.write_bytes(sidecar.read_bytes()[:-5])
+    assert rag._load_normalized_cache(docs_path) is None
+    assert top_text(rag_store) == "ß1 ✓"
+    assert rag._load_normalized_cache(docs_path)[1] == ["ä0.md", "ß1 ✓.md", "c2.md", "d3.md"]
+
+
+def test_ordered_keys_follows_faiss_row_order():
+    ordered_keys = server.RagIndex._ordered_keys
+    assert ordered_keys({1: "b", 0: "a", 2: "c"}) == range(3)
+    assert ordered_keys({7: "b", 3: "a", 10: "c"}) == [3, 7, 10]
+    assert list(ordered_keys({"z": 1, "a": 2, "m": 3})) == ["z", "a", "m"]
+    assert list(ordered_keys({})) == []
+
+
+def test_dict_docstore_rows_line_up_with_the_index(tmp_path):
+    rag = server.RagIndex(tmp_path, "fake")
+    texts, sources = rag._normalize_metadata(
+        {2: {"text": "c"}, 0: {"text": "a", "metadata": {"source": "a.md"}}, 1: "b"}
+    )
+    assert texts == ["a", "b", "c"]
+    assert sources[0] == "a.md"
+
+
+class RecordingEmbedder:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, **kwargs):
+        self.batches.append(list(texts))
+        if "boom" in texts:
+            raise RuntimeError("model failed")
+        return [f"vec:{text}" for text in texts]
+
+
+def test_embed_batcher_coalesces_concurrent_encodes():
+    embedder = RecordingEmbedder()
+    batcher = server._EmbedBatcher(embedder, window=0.2)
+    results = {}
+    start = threading.Barrier(4)
+
+    def encode(text):
+        start.wait()
+        results[text] = batcher.encode(text)
+
+    threads = [threading.Thread(target=encode, args=(f"t{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {f"t{i}": f"vec:t{i}" for i in range(4)}
+    assert sum(len(batch) for batch in embedder.batches) == 4
+    assert len(embedder.batches) < 4
+
+
+def test_embed_batcher_encode_many_shares_one_batch_and_propagates_errors():
+    embedder = RecordingEmbedder()
+    batcher = server._EmbedBatcher(embedder, max_batch=8)
+    assert batcher.encode_many(["a", "b", "c"]) == ["vec:a", "vec:b", "vec:c"]
+    assert embedder.batches == [["a", "b", "c"]]
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.encode("boom")
+    assert batcher.encode("d") == "vec:d"
+
+
+@pytest.mark.parametrize("docstore", ["docstore.json", "docstore.pkl"])
+def test_rag_query_columnar_format_transposes_the_matches(client, rag_store, monkeypatch, docstore):
+    write_docstore(rag_store / docstore, ["a0", "a1", "a2", "a3"])
+    monkeypatch.setattr(server, "rag_index", server.RagIndex(rag_store, "fake"))
+
+    rows = client.post("/api/rag/query", json={"q": "q 2", "k": 3}).get_json()["matches"]
+    columns = client.post("/api/rag/query?format=columnar", json={"q": "q 2", "k": 3}).get_json()
+
+    assert [row["text"] for row in rows][0] == "a2"
+    assert columns == {
+        "matches": {
+            "text": [row["text"] for row in rows],
+            "source": [row["source"] for row in rows],
+            "score": [row["score"] for row in rows],
+        }
+    }
@@ -1,4 +1,6 @@
+import array
 import sys
+import tracemalloc
 from pathlib import Path
 
 import pytest
@@ -13,6 +15,8 @@ from vectorizer import (  # noqa: E402  - imported after sys.path manipulation
     tokenize,
     vectorize,
     vectorize_corpus,
+    vectorize_corpus_array,
+    vectorize_corpus_stream,
     vectorize_document,
 )
 
@@ -21,6 +25,11 @@ def test_tokenize_basic_case_and_lowercasing():
     assert tokenize("Hello, World! 42") == ["hello", "world", "42"]
 
 
+def test_tokenize_lowercases_each_token_independently():
+    # Lower-casing the whole text would give a medial "σ" for the final sigma.
+    assert tokenize("ΟΔΟΣ'Α") == ["οδος", "α"]
+
+
 def test_build_vocabulary_order_and_min_frequency():
     vocab = build_vocabulary(["foo bar", "foo baz", "qux"], min_frequency=2)
     assert list(vocab.keys()) == ["foo"]
@@ -33,12 +42,63 @@ def test_vectorize_document_binary_and_counts():
     assert vectorize_document(tokens, vocab, binary=True) == [1, 1]
 
 
+def test_vectorize_document_fills_out_buffer():
+    vocab = {"foo": 0, "bar": 1}
+    buffer = array.array("i", [7, 7])
+    result = vectorize_document(["foo", "foo"], vocab, out=buffer)
+    assert result is buffer
+    assert buffer.tolist() == [2, 0]
+
+
 def test_vectorize_corpus_builds_vocabulary_and_returns_matrix():
     matrix, vocab = vectorize_corpus(["foo bar", "bar baz"])
     assert matrix == [[1, 1, 0], [0, 1, 1]]
     assert list(vocab.keys()) == ["foo", "bar", "baz"]
 
 
+def test_vectorize_corpus_stream_yields_rows_lazily():
+    rows = vectorize_corpus_stream((doc for doc in ["foo bar foo", "baz"]), vocabulary=["foo", "bar"])
+    assert next(rows) == [2, 1]
+    assert list(rows) == [[0, 0]]
+
+    buffer = array.array("i", [0, 0])
+    rows = vectorize_corpus_stream(["foo bar foo", "bar"], vocabulary=["foo", "bar"], out=buffer)
+    assert [row.tolist() for row in rows if row is buffer] == [[2, 1], [0, 1]]
+
+
+def test_vectorize_corpus_stream_clears_array_buffer_without_allocating():
+    vocabulary = [f"t{i}" for i in range(50_000)]
+    buffer = array.array("i", bytes(4 * len(vocabulary)))
+    rows = vectorize_corpus_stream(["t1 t2 t1"] * 20, vocabulary=vocabulary, out=buffer)
+    next(rows)  # the zero template is built once, with the first row
+
+    tracemalloc.start()
+    try:
+        assert all(row[1] == 2 and row[2] == 1 for row in rows)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < buffer.itemsize * len(buffer) // 10
+
+
+def test_vectorize_corpus_array_matches_list_matrix():
+    pytest.importorskip("numpy")
+    corpus = ["foo bar foo", "bar baz", "spam"]
+    matrix, _ = vectorize_corpus_array(corpus)
+    assert matrix.dtype.name == "int32"
+    assert matrix.tolist() == vectorize_corpus(corpus)[0]
+    binary, _ = vectorize_corpus_array(corpus, vocabulary=["foo", "bar", "baz"], binary=True)
+    assert binary.tolist() == [[1, 1, 0], [0, 1, 1], [0, 0, 0]]
+
+
+def test_vectorize_corpus_sparse_matches_dense():
+    pytest.importorskip("scipy")
+    corpus = ["foo bar foo", "bar baz", "spam"]
+    matrix, vocab = vectorize_corpus(corpus, return_sparse=True)
+    assert matrix.shape == (3, len(vocab))
+    assert matrix.toarray().tolist() == vectorize_corpus(corpus)[0]
+
+
 def test_vectorizer_roundtrip_inverse_transform():
     vec = Vectorizer()
     matrix = vec.fit_transform(["foo foo", "bar"])
@@ -46,6 +106,17 @@ def test_vectorizer_roundtrip_inverse_transform():
     assert vec.inverse_transform(matrix) == [["foo", "foo"], ["bar"]]
 
 
+def test_vectorizer_fit_reuses_cached_vocabulary(tmp_path):
+    corpus = ["foo bar", "bar baz"]
+    first = Vectorizer().fit(corpus, cache_path=tmp_path).vocabulary_
+    assert first == build_vocabulary(corpus)
+    (cache_file,) = tmp_path.glob("*.vocab")
+    # A sentinel vocabulary proves the second fit reads the file back.
+    cache_file.write_bytes(b"cached\nterms")
+    second = Vectorizer().fit(corpus, cache_path=tmp_path).vocabulary_
+    assert second == {"cached": 0, "terms": 1}
+
+
 def test_vectorize_wrapper_single_document():
     vector, vocab = vectorize("foo bar foo")
     assert vector == [2, 1]
@@ -15,22 +15,55 @@ implementation.  The design is intentionally conservative; inputs are validated
 and iterables are copied defensively in order to provide deterministic
 behaviour.  The implementation only relies on the standard library which keeps
 the dependency surface minimal while still being perfectly adequate for unit
-testing scenarios.
+testing scenarios.  NumPy is optional and only needed by
+:func:`vectorize_corpus_array`; SciPy is only needed for ``return_sparse=True``.
 """
 
 from __future__ import annotations
 
-from collections import Counter, OrderedDict
+import array
+from collections import Counter
 from dataclasses import dataclass, field
+import hashlib
+from itertools import chain, compress, repeat
+import os
+from pathlib import Path
 import re
-from typing import Iterable, List, Mapping, MutableMapping, Sequence, Tuple
-
-
-_TOKEN_RE = re.compile(r"\b\w+\b", flags=re.UNICODE)
-
-
-def _ensure_iterable(texts: Iterable[str]) -> List[str]:
-    """Return ``texts`` as a list after validating its contents."""
+import sys
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Sized,
+    Tuple,
+)
+
+try:  # pragma: no cover - optional dependency
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+try:  # pragma: no cover - optional dependency
+    from scipy import sparse
+except Exception:  # pragma: no cover - optional dependency
+    sparse = None
+
+
+# ``\w+`` already matches maximal word runs, so ``\b`` anchors add nothing.
+_TOKEN_RE = re.compile(r"\w+", flags=re.UNICODE)
+
+
+def _ensure_iterable(texts: Iterable[str], *, validate: bool = True) -> List[str]:
+    """Return ``texts`` as a list after validating its contents.
+
+    With ``validate=False`` the per-item type check is skipped; callers that
+    tokenize every item still get a ``TypeError`` from :func:`tokenize`.
+    """
 
     if isinstance(texts, str):
         raise TypeError("expected an iterable of strings, got a single string")
@@ -40,9 +73,10 @@ def _ensure_iterable(texts: Iterable[str]) -> List[str]:
     except TypeError as exc:  # pragma: no cover - defensive coding
         raise TypeError("texts must be an iterable of strings") from exc
 
-    for item in items:
-        if not isinstance(item, str):
-            raise TypeError("all items in the corpus must be strings")
+    if validate:
+        for item in items:
+            if not isinstance(item, str):
+                raise TypeError("all items in the corpus must be strings")
 
     return items
 
@@ -69,16 +103,42 @@ def tokenize(text: str, *, lowercase: bool = True) -> List[str]:
 
     tokens = _TOKEN_RE.findall(text)
     if lowercase:
-        tokens = [token.lower() for token in tokens]
+        # Lower each token rather than the whole text: case mappings such as
+        # the Greek final sigma depend on the neighbouring characters, so
+        # lowering first can change the tokens.  ``map`` keeps this in C.
+        tokens = list(map(str.lower, tokens))
     return tokens
 
 
+_MATCH_GROUP = re.Match.group
+
+# Documents shorter than this are tokenized with ``findall``: the list is small
+# and ``findall`` is markedly faster than pulling matches from ``finditer``.
+_ITOKENIZE_MIN_CHARS = 1 << 20
+
+
+def _itokenize(text: str, *, lowercase: bool = True) -> Iterable[str]:
+    """Return the tokens :func:`tokenize` would, lazily for long documents.
+
+    Long documents are scanned lazily so consumers that iterate the tokens once
+    never hold the whole token list in memory; short ones come back as a list.
+    """
+
+    if not isinstance(text, str):
+        raise TypeError("text must be a string")
+
+    if len(text) < _ITOKENIZE_MIN_CHARS:
+        return tokenize(text, lowercase=lowercase)
+    tokens = map(_MATCH_GROUP, _TOKEN_RE.finditer(text))
+    return map(str.lower, tokens) if lowercase else tokens
+
+
 def build_vocabulary(
     corpus: Iterable[str],
     *,
     lowercase: bool = True,
     min_frequency: int = 1,
-) -> OrderedDict[str, int]:
+) -> Dict[str, int]:
     """Create an ordered vocabulary from *corpus*.
 
     The vocabulary maps each token to the index at which it appears in the
@@ -90,57 +150,238 @@ def build_vocabulary(
         raise ValueError("min_frequency must be at least 1")
 
     documents = _ensure_iterable(corpus)
-
-    counts: MutableMapping[str, int] = OrderedDict()
-    for document in documents:
-        for token in tokenize(document, lowercase=lowercase):
-            counts[token] = counts.get(token, 0) + 1
-
-    vocabulary: "OrderedDict[str, int]" = OrderedDict()
+    return _build_vocabulary_from_tokens(
+        (_itokenize(document, lowercase=lowercase) for document in documents),
+        min_frequency,
+    )
+
+
+def _build_vocabulary_from_tokens(
+    token_lists: Iterable[Iterable[str]], min_frequency: int
+) -> Dict[str, int]:
+    """Build the vocabulary from already tokenized documents."""
+
+    # ``Counter`` keeps first-seen order, which fixes the vocabulary order.
+    counts: Counter[str] = Counter()
+    for tokens in token_lists:
+        counts.update(tokens)
+
+    # Interning the kept terms lets vocabularies built from different corpora
+    # share one string object per term.  Per-token interning in ``tokenize``
+    # would cost a Python call per token, so only the survivors are interned.
+    vocabulary: Dict[str, int] = {}
     for token, frequency in counts.items():
         if frequency >= min_frequency:
-            vocabulary[token] = len(vocabulary)
+            vocabulary[sys.intern(token)] = len(vocabulary)
 
     return vocabulary
 
 
-def _normalise_vocabulary(vocabulary: Mapping[str, int] | Sequence[str]) -> OrderedDict[str, int]:
-    """Return *vocabulary* as an :class:`OrderedDict` instance."""
+def _vocabulary_cache_key(
+    documents: Sequence[str], *, lowercase: bool, min_frequency: int
+) -> str:
+    """Return a short hex digest identifying a vocabulary build."""
+
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{int(lowercase)}:{min_frequency}".encode("ascii"))
+    for document in documents:
+        data = document.encode("utf-8", "surrogatepass")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _load_vocabulary_cache(path: Path) -> Optional[Dict[str, int]]:
+    """Read a vocabulary written by :func:`_store_vocabulary_cache`.
+
+    The file holds the terms in index order, one per line; tokens never
+    contain whitespace so no escaping is needed.
+    """
+
+    try:
+        data = path.read_bytes()
+        terms = data.decode("utf-8").split("\n") if data else []
+    except (OSError, UnicodeDecodeError):
+        return None
+    return {sys.intern(term): index for index, term in enumerate(terms)}
+
+
+def _store_vocabulary_cache(path: Path, vocabulary: Mapping[str, int]) -> None:
+    """Atomically write *vocabulary* to *path*; failures are ignored."""
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes("\n".join(vocabulary).encode("utf-8"))
+        os.replace(tmp_path, path)
+    except OSError:  # pragma: no cover - best effort cache
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def _normalise_vocabulary(vocabulary: Mapping[str, int] | Sequence[str]) -> Dict[str, int]:
+    """Return *vocabulary* as an insertion-ordered ``dict`` of term to index."""
 
     if isinstance(vocabulary, Mapping):
         ordered = sorted(vocabulary.items(), key=lambda item: item[1])
-        return OrderedDict((term, int(index)) for term, index in ordered)
+        return {term: int(index) for term, index in ordered}
 
     if isinstance(vocabulary, Sequence):
-        return OrderedDict((term, position) for position, term in enumerate(vocabulary))
+        return {term: position for position, term in enumerate(vocabulary)}
 
     raise TypeError("vocabulary must be a mapping or sequence of strings")
 
 
+# Token count from which :func:`vectorize_document` counts tokens with a
+# ``Counter`` before mapping them; smaller documents measured faster without.
+_COUNT_MIN_TOKENS = 20_000
+
+
+def _zero_template(buffer: MutableSequence[int]) -> MutableSequence[int] | None:
+    """Return a zero sequence that clears *buffer* via ``buffer[:] = template``.
+
+    Returns ``None`` for buffers with a ``fill`` method (NumPy arrays), which
+    are zeroed in place without one.
+    """
+
+    if hasattr(buffer, "fill"):
+        return None
+    if isinstance(buffer, array.array):
+        return array.array(buffer.typecode, bytes(buffer.itemsize * len(buffer)))
+    return [0] * len(buffer)
+
+
+def _zero_fill(
+    buffer: MutableSequence[int], template: MutableSequence[int] | None = None
+) -> None:
+    """Reset every element of *buffer* to zero in place.
+
+    Callers clearing the same buffer repeatedly pass a *template* from
+    :func:`_zero_template`; otherwise one is built for this call.
+    """
+
+    if hasattr(buffer, "fill"):
+        buffer.fill(0)
+    else:
+        buffer[:] = _zero_template(buffer) if template is None else template
+
+
 def vectorize_document(
     tokens: Iterable[str],
     vocabulary: Mapping[str, int],
     *,
     binary: bool = False,
-) -> List[int]:
-    """Convert *tokens* to a numeric vector using *vocabulary*."""
+    out: MutableSequence[int] | None = None,
+) -> MutableSequence[int]:
+    """Convert *tokens* to a numeric vector using *vocabulary*.
+
+    *out* may be a pre-allocated buffer of ``len(vocabulary)`` integers, such as
+    ``array.array("i", bytes(4 * len(vocabulary)))``, which packs the counts
+    far more tightly than a list.  It is zeroed, filled and returned instead of
+    allocating a new list.
+    """
 
     if not isinstance(vocabulary, Mapping):
         raise TypeError("vocabulary must be a mapping")
 
-    vector = [0] * len(vocabulary)
-    for token in tokens:
-        try:
-            index = vocabulary[token]
-        except KeyError:
-            continue
+    if out is None:
+        vector = [0] * len(vocabulary)
+    else:
+        if len(out) != len(vocabulary):
+            raise ValueError("out length does not match vocabulary size")
+        _zero_fill(out)
+        vector = out
+    return _count_into(vector, tokens, vocabulary, binary=binary)
+
+
+def _count_into(
+    vector: MutableSequence[int],
+    tokens: Iterable[str],
+    vocabulary: Mapping[str, int],
+    *,
+    binary: bool,
+) -> MutableSequence[int]:
+    """Add the counts (or presence flags) of *tokens* to the zeroed *vector*."""
+
+    vocab_get = vocabulary.get
+    # ``.get`` avoids a KeyError per unknown token.  For long documents (and
+    # lazily produced tokens, which only come from long ones) counting or
+    # de-duplicating in C first pays off, as the Python loop then runs once per
+    # distinct token; below the threshold building the Counter costs more.
+    if isinstance(tokens, Sized) and len(tokens) < _COUNT_MIN_TOKENS:
         if binary:
-            vector[index] = 1
+            for token in tokens:
+                index = vocab_get(token)
+                if index is not None:
+                    vector[index] = 1
         else:
-            vector[index] += 1
+            for token in tokens:
+                index = vocab_get(token)
+                if index is not None:
+                    vector[index] += 1
+    elif binary:
+        for token in set(tokens):
+            index = vocab_get(token)
+            if index is not None:
+                vector[index] = 1
+    else:
+        for token, count in Counter(tokens).items():
+            index = vocab_get(token)
+            if index is not None:
+                vector[index] += count
     return vector
 
 
+def _csr_components(
+    documents: Sequence[str],
+    vocabulary: Mapping[str, int],
+    *,
+    lowercase: bool,
+    binary: bool,
+) -> Tuple[List[int], List[int], List[int]]:
+    """Return the ``(data, indices, indptr)`` arrays of a CSR count matrix."""
+
+    data: List[int] = []
+    indices: List[int] = []
+    indptr = [0]
+    vocab_get = vocabulary.get
+    for document in documents:
+        counts = Counter(map(vocab_get, _itokenize(document, lowercase=lowercase)))
+        counts.pop(None, None)
+        for index, count in sorted(counts.items()):
+            indices.append(index)
+            data.append(1 if binary else count)
+        indptr.append(len(indices))
+    return data, indices, indptr
+
+
+def _sparse_matrix(
+    documents: Sequence[str],
+    vocabulary: Mapping[str, int],
+    *,
+    lowercase: bool,
+    binary: bool,
+):
+    """Return a ``scipy.sparse.csr_matrix`` of token counts for *documents*."""
+
+    if sparse is None or np is None:
+        raise ImportError("return_sparse=True requires scipy")
+
+    data, indices, indptr = _csr_components(
+        documents, vocabulary, lowercase=lowercase, binary=binary
+    )
+    return sparse.csr_matrix(
+        (
+            np.asarray(data, dtype=np.int32),
+            np.asarray(indices, dtype=np.int32),
+            np.asarray(indptr, dtype=np.int32),
+        ),
+        shape=(len(documents), len(vocabulary)),
+    )
+
+
 def vectorize_corpus(
     corpus: Iterable[str],
     *,
@@ -148,11 +389,14 @@ def vectorize_corpus(
     lowercase: bool = True,
     binary: bool = False,
     min_frequency: int = 1,
-) -> Tuple[List[List[int]], OrderedDict[str, int]]:
+    return_sparse: bool = False,
+) -> Tuple[List[List[int]], Dict[str, int]]:
     """Return the feature matrix and vocabulary for *corpus*.
 
     When *vocabulary* is provided the matrix is generated using the supplied
-    mapping.  Otherwise the vocabulary is inferred from *corpus*.
+    mapping.  Otherwise the vocabulary is inferred from *corpus*.  With
+    ``return_sparse=True`` the matrix is a SciPy CSR matrix, which only stores
+    the non-zero counts.
     """
 
     documents = _ensure_iterable(corpus)
@@ -164,9 +408,15 @@ def vectorize_corpus(
     else:
         vocabulary = _normalise_vocabulary(vocabulary)
 
+    if return_sparse:
+        matrix = _sparse_matrix(
+            documents, vocabulary, lowercase=lowercase, binary=binary
+        )
+        return matrix, vocabulary
+
     matrix = [
         vectorize_document(
-            tokenize(document, lowercase=lowercase),
+            _itokenize(document, lowercase=lowercase),
             vocabulary,
             binary=binary,
         )
@@ -176,7 +426,103 @@ def vectorize_corpus(
     return matrix, vocabulary
 
 
-@dataclass
+def vectorize_corpus_stream(
+    corpus: Iterable[str],
+    *,
+    vocabulary: Mapping[str, int] | Sequence[str],
+    lowercase: bool = True,
+    binary: bool = False,
+    out: MutableSequence[int] | None = None,
+) -> Iterator[MutableSequence[int]]:
+    """Yield one feature vector per document of *corpus*, lazily.
+
+    Unlike :func:`vectorize_corpus` the corpus is never collected into a list,
+    so a generator streaming documents from disk only holds one document at a
+    time.  A *vocabulary* is required because inferring one needs a full pass
+    over the corpus first; build it with :func:`build_vocabulary` beforehand.
+
+    When *out* is given every row is written into that one buffer (see
+    :func:`vectorize_document`) and the same object is yielded each time, so
+    consume or copy a row before advancing the iterator.  An ``array.array``
+    or NumPy buffer is cleared between rows without allocating; clearing a
+    list still makes CPython take a temporary buffer of item pointers.
+    """
+
+    if isinstance(corpus, str):
+        raise TypeError("expected an iterable of strings, got a single string")
+
+    vocabulary = _normalise_vocabulary(vocabulary)
+    if out is not None and len(out) != len(vocabulary):
+        raise ValueError("out length does not match vocabulary size")
+    return _stream_rows(
+        iter(corpus), vocabulary, lowercase=lowercase, binary=binary, out=out
+    )
+
+
+def _stream_rows(
+    documents: Iterator[str],
+    vocabulary: Mapping[str, int],
+    *,
+    lowercase: bool,
+    binary: bool,
+    out: MutableSequence[int] | None,
+) -> Iterator[MutableSequence[int]]:
+    # One zero template per stream: clearing *out* copies it in place instead
+    # of building a full-size zero sequence for every row.
+    zeros = None if out is None else _zero_template(out)
+    for document in documents:
+        if not isinstance(document, str):
+            raise TypeError("all items in the corpus must be strings")
+        tokens = _itokenize(document, lowercase=lowercase)
+        if out is None:
+            yield vectorize_document(tokens, vocabulary, binary=binary)
+        else:
+            _zero_fill(out, zeros)
+            yield _count_into(out, tokens, vocabulary, binary=binary)
+
+
+def vectorize_corpus_array(
+    corpus: Iterable[str],
+    *,
+    vocabulary: Mapping[str, int] | Sequence[str] | None = None,
+    lowercase: bool = True,
+    binary: bool = False,
+    min_frequency: int = 1,
+):
+    """Like :func:`vectorize_corpus` but return a NumPy ``int32`` matrix.
+
+    The matrix is allocated once and each row is filled from the document's
+    vocabulary indices, avoiding one Python ``int`` per cell.  Requires NumPy.
+    """
+
+    if np is None:
+        raise ImportError("vectorize_corpus_array requires numpy")
+
+    documents = _ensure_iterable(corpus)
+
+    if vocabulary is None:
+        vocabulary = build_vocabulary(
+            documents, lowercase=lowercase, min_frequency=min_frequency
+        )
+    else:
+        vocabulary = _normalise_vocabulary(vocabulary)
+
+    size = len(vocabulary)
+    matrix = np.zeros((len(documents), size), dtype=np.int32)
+    vocab_get = vocabulary.get
+    for row, document in zip(matrix, documents):
+        lookups = map(vocab_get, _itokenize(document, lowercase=lowercase))
+        known = (index for index in lookups if index is not None)
+        indices = np.fromiter(known, dtype=np.intp)
+        if binary:
+            row[indices] = 1
+        else:
+            row[:] = np.bincount(indices, minlength=size)
+
+    return matrix, vocabulary
+
+
+@dataclass(slots=True)
 class Vectorizer:
     """A compact bag-of-words vectorizer.
 
@@ -188,33 +534,73 @@ class Vectorizer:
     lowercase: bool = True
     binary: bool = False
     min_frequency: int = 1
-    _vocabulary: OrderedDict[str, int] | None = field(default=None, init=False, repr=False)
+    _vocabulary: Dict[str, int] | None = field(default=None, init=False, repr=False)
+
+    def fit(
+        self, corpus: Iterable[str], *, cache_path: str | Path | None = None
+    ) -> "Vectorizer":
+        """Learn a vocabulary from *corpus*.
+
+        When *cache_path* names a directory, the vocabulary is stored there
+        keyed by a hash of the corpus and settings, and later fits on the same
+        corpus read it back instead of tokenizing again.
+        """
 
-    def fit(self, corpus: Iterable[str]) -> "Vectorizer":
-        """Learn a vocabulary from *corpus*."""
+        if cache_path is None:
+            self._vocabulary = build_vocabulary(
+                corpus, lowercase=self.lowercase, min_frequency=self.min_frequency
+            )
+            return self
 
-        self._vocabulary = build_vocabulary(
-            corpus, lowercase=self.lowercase, min_frequency=self.min_frequency
+        documents = _ensure_iterable(corpus)
+        key = _vocabulary_cache_key(
+            documents, lowercase=self.lowercase, min_frequency=self.min_frequency
         )
+        path = Path(cache_path) / f"{key}.vocab"
+        vocabulary = _load_vocabulary_cache(path)
+        if vocabulary is None:
+            vocabulary = build_vocabulary(
+                documents, lowercase=self.lowercase, min_frequency=self.min_frequency
+            )
+            _store_vocabulary_cache(path, vocabulary)
+        self._vocabulary = vocabulary
         return self
 
     def fit_transform(self, corpus: Iterable[str]) -> List[List[int]]:
         """Convenience wrapper that combines :meth:`fit` and :meth:`transform`."""
 
-        corpus_list = _ensure_iterable(corpus)
-        self.fit(corpus_list)
-        return self.transform(corpus_list)
+        if self.min_frequency < 1:
+            raise ValueError("min_frequency must be at least 1")
 
-    def transform(self, corpus: Iterable[str]) -> List[List[int]]:
-        """Vectorise *corpus* using the learned vocabulary."""
+        # Tokenize once and reuse the tokens for both the vocabulary and the
+        # matrix instead of letting fit() and transform() each tokenize.
+        token_lists = [
+            tokenize(document, lowercase=self.lowercase)
+            for document in _ensure_iterable(corpus, validate=False)
+        ]
+        self._vocabulary = _build_vocabulary_from_tokens(token_lists, self.min_frequency)
+        return [
+            vectorize_document(tokens, self._vocabulary, binary=self.binary)
+            for tokens in token_lists
+        ]
+
+    def transform(self, corpus: Iterable[str], *, return_sparse: bool = False) -> List[List[int]]:
+        """Vectorise *corpus* using the learned vocabulary.
+
+        ``return_sparse=True`` returns a SciPy CSR matrix instead of lists.
+        """
 
         if self._vocabulary is None:
             raise ValueError("Vectorizer instance is not fitted")
 
-        documents = _ensure_iterable(corpus)
+        documents = _ensure_iterable(corpus, validate=False)
+        if return_sparse:
+            return _sparse_matrix(
+                documents, self._vocabulary, lowercase=self.lowercase, binary=self.binary
+            )
         return [
             vectorize_document(
-                tokenize(document, lowercase=self.lowercase),
+                _itokenize(document, lowercase=self.lowercase),
                 self._vocabulary,
                 binary=self.binary,
             )
@@ -227,23 +613,27 @@ class Vectorizer:
         if self._vocabulary is None:
             raise ValueError("Vectorizer instance is not fitted")
 
-        vocabulary_items = list(self._vocabulary.items())
+        vocab_tokens = list(self._vocabulary)
         inverse = []
         for row in matrix:
-            if len(row) != len(vocabulary_items):
+            if len(row) != len(vocab_tokens):
                 raise ValueError("row length does not match vocabulary size")
-            row_tokens = []
-            for count, (token, _) in zip(row, vocabulary_items):
-                if count:
-                    if self.binary:
-                        row_tokens.append(token)
-                    else:
-                        row_tokens.extend([token] * int(count))
-            inverse.append(row_tokens)
+            if self.binary:
+                inverse.append(list(compress(vocab_tokens, row)))
+            else:
+                inverse.append(
+                    list(
+                        chain.from_iterable(
+                            repeat(token, int(count))
+                            for token, count in zip(vocab_tokens, row)
+                            if count
+                        )
+                    )
+                )
         return inverse
 
     @property
-    def vocabulary_(self) -> OrderedDict[str, int]:
+    def vocabulary_(self) -> Dict[str, int]:
         """The learnt vocabulary.
 
         The attribute name mimics the naming convention used by scikit-learn.
@@ -262,7 +652,7 @@ def vectorize(
     lowercase: bool = True,
     binary: bool = False,
     min_frequency: int = 1,
-) -> Tuple[List[List[int]] | List[int], OrderedDict[str, int]]:
+) -> Tuple[List[List[int]] | List[int], Dict[str, int]]:
     """High-level convenience wrapper around :class:`Vectorizer`.
 
     ``corpus`` may be a single string or an iterable of strings.  The function
@@ -296,6 +686,8 @@ __all__ = [
     "tokenize",
     "vectorize",
     "vectorize_corpus",
+    "vectorize_corpus_array",
+    "vectorize_corpus_stream",
     "vectorize_document",
 ]
 